@@ -0,0 +1,90 @@
+"""Compare SQLite file size of inline findings_json with the content-addressed layout.
+
+Each scenario stores the same scans twice, once per layout, then runs VACUUM
+and reports the file sizes. Run from the backend directory:
+
+    python benchmarks/bench_findings_storage.py --findings 2000 --scans 30
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from sqlmodel import Session, SQLModel, create_engine  # noqa: E402
+
+from findings_store import load_findings, store_findings  # noqa: E402
+from models import ScanResult  # noqa: E402
+
+CATEGORIES = ["IAM", "S3", "CloudTrail", "Network", "KMS", "EC2", "RDS"]
+SEVERITIES = ["High", "Medium", "Low"]
+
+
+def build_scans(findings: int, scans: int, changed_per_scan: int):
+    """Yield the finding lists of consecutive scans; ``changed_per_scan`` findings differ each time."""
+    current = [
+        {
+            "category": CATEGORIES[index % len(CATEGORIES)],
+            "description": f"Security group sg-{index:08x} allows 0.0.0.0/0 on port {index % 65535}.",
+            "severity": SEVERITIES[index % len(SEVERITIES)],
+        }
+        for index in range(findings)
+    ]
+    for scan in range(scans):
+        for offset in range(changed_per_scan if scan else 0):
+            index = (scan * changed_per_scan + offset) % findings
+            current[index] = dict(current[index], description=f"{current[index]['description']} (scan {scan})")
+        yield list(current)
+
+
+def measure(layout: str, scan_findings) -> int:
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, f"{layout}.db")
+    engine = create_engine(f"sqlite:///{path}")
+    SQLModel.metadata.create_all(engine)
+
+    with Session(engine) as session:
+        for findings in scan_findings:
+            counts = {severity: sum(1 for f in findings if f["severity"] == severity) for severity in SEVERITIES}
+            scan = ScanResult(
+                credential_id=1,
+                score=0,
+                high_count=counts["High"],
+                medium_count=counts["Medium"],
+                low_count=counts["Low"],
+                findings_json=json.dumps(findings) if layout == "inline" else "",
+            )
+            session.add(scan)
+            session.flush()
+            if layout != "inline":
+                store_findings(session, scan.id, findings)
+            session.commit()
+        assert load_findings(session, scan) == findings
+
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        connection.exec_driver_sql("VACUUM")
+    engine.dispose()
+    return os.path.getsize(path)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--findings", type=int, default=2000)
+    parser.add_argument("--scans", type=int, default=30)
+    args = parser.parse_args()
+
+    row = "  {:<28} {:>12} {:>14} {:>10}"
+    print(f"{args.findings} findings per scan, {args.scans} scans (sizes after VACUUM)")
+    print(row.format("scenario", "inline", "content-addr.", "ratio"))
+    for label, changed in (("identical scans", 0), ("1% changed per scan", args.findings // 100), ("10% changed per scan", args.findings // 10)):
+        inline = measure("inline", build_scans(args.findings, args.scans, changed))
+        addressed = measure("addressed", build_scans(args.findings, args.scans, changed))
+        print(row.format(label, f"{inline / 1024:.0f} KiB", f"{addressed / 1024:.0f} KiB", f"{addressed / inline:.2f}x"))
+
+
+if __name__ == "__main__":
+    main()
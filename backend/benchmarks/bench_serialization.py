@@ -0,0 +1,95 @@
+"""Compare the default FastAPI response path with the fast path for large scans.
+
+Run from the backend directory:
+
+    python benchmarks/bench_serialization.py --findings 20000
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+
+from models import ScanResultDetail  # noqa: E402
+from utils import serialization  # noqa: E402
+
+CATEGORIES = ["IAM", "S3", "CloudTrail", "Network", "KMS", "EC2", "RDS"]
+SEVERITIES = ["High", "Medium", "Low"]
+
+
+def build_detail(count: int) -> dict:
+    findings = [
+        {
+            "category": CATEGORIES[index % len(CATEGORIES)],
+            "description": f"Resource arn:aws:service:us-east-1:123456789012:resource/{index} is misconfigured.",
+            "severity": SEVERITIES[index % len(SEVERITIES)],
+        }
+        for index in range(count)
+    ]
+    return {
+        "id": 1,
+        "executed_at": datetime.utcnow(),
+        "score": 0,
+        "high_count": count // 3,
+        "medium_count": count // 3,
+        "low_count": count - 2 * (count // 3),
+        "findings": findings,
+    }
+
+
+def default_path(detail: dict) -> bytes:
+    # What FastAPI does for a response_model endpoint returning a pydantic model.
+    model = ScanResultDetail(**detail)
+    content = jsonable_encoder(model)
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def fast_path(detail: dict) -> bytes:
+    return serialization.dumps(detail)
+
+
+def timed(func, *args, repeat: int):
+    samples = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--findings", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=7)
+    args = parser.parse_args()
+
+    detail = build_detail(args.findings)
+    encoder = "orjson" if serialization.orjson is not None else "json"
+
+    default_ms, default_body = timed(default_path, detail, repeat=args.repeat)
+    fast_ms, fast_body = timed(fast_path, detail, repeat=args.repeat)
+    assert json.loads(default_body) == json.loads(fast_body)
+
+    row = "  {:<46} {:>8.1f} ms {:>10} bytes"
+    print(f"{args.findings} findings, median of {args.repeat} runs")
+    print(row.format("default (pydantic + jsonable_encoder + json)", default_ms, len(default_body)))
+    print(row.format(f"fast ({encoder})", fast_ms, len(fast_body)))
+    print(f"  speedup: {default_ms / fast_ms:.1f}x")
+
+    # Compression runs once per cached entry; later requests reuse the encoded body.
+    for encoding in serialization.supported_encodings():
+        encode_ms, encoded = timed(serialization.encode, fast_body, encoding, repeat=args.repeat)
+        saved = 100 * (1 - len(encoded) / len(fast_body))
+        print(row.format(f"{encoding} of fast body", encode_ms, len(encoded)) + f" ({saved:.1f}% saved)")
+
+
+if __name__ == "__main__":
+    main()
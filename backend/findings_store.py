@@ -0,0 +1,184 @@
+"""Content-addressed storage for scan findings.
+
+Each distinct finding is stored once in ``FindingBlob`` as canonical JSON,
+identified by its raw SHA-256 digest. A scan's ordered finding list is stored
+once in ``FindingManifest``, keyed by the SHA-256 of the ordered digests, as the
+zlib-compressed deltas of the blobs' ids; the scan points at it through a
+single ``ScanManifest`` row. A scan whose findings did not change therefore
+adds one small row, and a changed scan adds its new findings plus a manifest
+whose compressed size follows the number of changes. Scans stored before this
+layout keep their findings inline in ``ScanResult.findings_json`` until
+``compact_findings`` migrates them.
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import struct
+import zlib
+from typing import Dict, Iterable, List, Sequence
+
+from sqlalchemy import insert
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlmodel import Session, select
+
+from models import FindingBlob, FindingManifest, ScanManifest, ScanResult
+
+logger = logging.getLogger(__name__)
+
+# Keeps IN (...) lists well below SQLite's bound parameter limit.
+_CHUNK_SIZE = 500
+
+
+def _canonical(finding: Dict) -> bytes:
+    return json.dumps(finding, sort_keys=True, separators=(",", ":")).encode("utf-8")
+
+
+def _chunks(items: Sequence, size: int = _CHUNK_SIZE) -> Iterable[Sequence]:
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
+
+
+def _pack_ids(ids: List[int]) -> bytes:
+    # Consecutive ids become runs of identical deltas, which zlib collapses.
+    deltas = [current - previous for previous, current in zip([0] + ids, ids)]
+    return zlib.compress(struct.pack(f"<{len(deltas)}q", *deltas))
+
+
+def _unpack_ids(data: bytes) -> List[int]:
+    raw = zlib.decompress(data)
+    ids: List[int] = []
+    current = 0
+    for delta in struct.unpack(f"<{len(raw) // 8}q", raw):
+        current += delta
+        ids.append(current)
+    return ids
+
+
+def _blob_ids(session: Session, digests: List[bytes]) -> Dict[bytes, int]:
+    ids: Dict[bytes, int] = {}
+    for chunk in _chunks(digests):
+        ids.update(
+            session.exec(
+                select(FindingBlob.digest, FindingBlob.id).where(FindingBlob.digest.in_(chunk))
+            ).all()
+        )
+    return ids
+
+
+def _insert_ignoring_duplicates(session: Session, model, rows: List[Dict]) -> None:
+    """Bulk insert ``rows``, skipping ones whose digest already exists.
+
+    Two scans storing the same new finding or manifest concurrently would
+    otherwise fail on the digest's unique constraint.
+    """
+    if not rows:
+        return
+    dialect = session.get_bind().dialect.name
+    if dialect == "sqlite":
+        statement = sqlite.insert(model).on_conflict_do_nothing()
+    elif dialect == "postgresql":
+        statement = postgresql.insert(model).on_conflict_do_nothing()
+    else:
+        existing = set(
+            session.exec(
+                select(model.digest).where(model.digest.in_([row["digest"] for row in rows]))
+            ).all()
+        )
+        rows = [row for row in rows if row["digest"] not in existing]
+        if not rows:
+            return
+        statement = insert(model)
+    session.execute(statement, rows)
+
+
+def store_findings(session: Session, scan_id: int, findings: List[Dict]) -> None:
+    """Add the scan's manifest reference and any new blobs to the caller's transaction without committing."""
+    canonical = [_canonical(finding) for finding in findings]
+    digests = [hashlib.sha256(data).digest() for data in canonical]
+    manifest_digest = hashlib.sha256(b"".join(digests)).digest()
+
+    if session.get(FindingManifest, manifest_digest) is None:
+        blobs = dict(zip(digests, canonical))
+        ids = _blob_ids(session, list(blobs))
+        missing = [digest for digest in blobs if digest not in ids]
+        _insert_ignoring_duplicates(
+            session, FindingBlob, [{"digest": digest, "data": blobs[digest]} for digest in missing]
+        )
+        ids.update(_blob_ids(session, missing))
+        _insert_ignoring_duplicates(
+            session,
+            FindingManifest,
+            [{"digest": manifest_digest, "data": _pack_ids([ids[digest] for digest in digests])}],
+        )
+
+    session.add(ScanManifest(scan_id=scan_id, manifest_digest=manifest_digest))
+
+
+def load_findings(session: Session, scan: ScanResult) -> List[Dict]:
+    """Return the findings of ``scan`` in their original order, whichever layout stores them."""
+    if scan.findings_json:
+        return json.loads(scan.findings_json)
+
+    manifest = session.exec(
+        select(FindingManifest.data)
+        .join(ScanManifest, ScanManifest.manifest_digest == FindingManifest.digest)
+        .where(ScanManifest.scan_id == scan.id)
+    ).first()
+    if manifest is None:
+        return []
+
+    ids = _unpack_ids(manifest)
+    blobs: Dict[int, bytes] = {}
+    for chunk in _chunks(list(dict.fromkeys(ids))):
+        blobs.update(
+            session.exec(
+                select(FindingBlob.id, FindingBlob.data).where(FindingBlob.id.in_(chunk))
+            ).all()
+        )
+    return [json.loads(blobs[blob_id]) for blob_id in ids]
+
+
+def compact_findings(session: Session, batch_size: int = 100) -> int:
+    """Move inline ``findings_json`` of legacy scans into the blob store; returns scans migrated."""
+    migrated = 0
+    while True:
+        scans = session.exec(
+            select(ScanResult).where(ScanResult.findings_json != "").limit(batch_size)
+        ).all()
+        if not scans:
+            break
+        for scan in scans:
+            store_findings(session, scan.id, json.loads(scan.findings_json))
+            scan.findings_json = ""
+            session.add(scan)
+        session.commit()
+        migrated += len(scans)
+        logger.info("Compacted %s scans", migrated)
+    return migrated
+
+
+def main() -> None:
+    from db import engine, init_db, session_scope
+
+    parser = argparse.ArgumentParser(description="Deduplicate stored scan findings.")
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument(
+        "--vacuum", action="store_true", help="Run VACUUM afterwards to shrink a SQLite file"
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    init_db()
+    with session_scope() as session:
+        migrated = compact_findings(session, args.batch_size)
+    logger.info("Compaction finished: %s scans migrated", migrated)
+
+    if args.vacuum and engine.dialect.name == "sqlite":
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+            connection.exec_driver_sql("VACUUM")
+
+
+if __name__ == "__main__":
+    main()
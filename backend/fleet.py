@@ -0,0 +1,169 @@
+"""Materialized per-credential posture backing the /fleet/summary endpoint.
+
+``update_posture`` runs inside the transaction that stores a ScanResult, so the
+FleetPosture table always reflects the latest committed scan of every
+credential and the endpoint never has to look at scan history or findings.
+"""
+
+import json
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import delete, func
+from sqlmodel import Session, select
+
+from findings_store import load_findings
+from models import (
+    CategoryImpact,
+    Credential,
+    FleetPosture,
+    FleetPostureRead,
+    FleetSummary,
+    FleetTotals,
+    ScanResult,
+)
+from utils.scoring import worst_categories
+
+logger = logging.getLogger(__name__)
+
+SORT_FIELDS = {
+    "score": FleetPosture.score,
+    "executed_at": FleetPosture.executed_at,
+    "high_count": FleetPosture.high_count,
+    "name": FleetPosture.credential_name,
+    "account_id": FleetPosture.account_id,
+}
+
+
+def update_posture(
+    session: Session, credential: Credential, scan: ScanResult, findings: List[Dict]
+) -> None:
+    """Upsert the credential's posture row in the caller's transaction without committing."""
+    posture = session.get(FleetPosture, credential.id)
+    if posture is not None and posture.executed_at > scan.executed_at:
+        # An older scan finishing late must not replace a newer posture.
+        return
+    if posture is None:
+        posture = FleetPosture(credential_id=credential.id)
+
+    posture.credential_name = credential.name
+    posture.account_id = credential.account_id
+    posture.role_name = credential.role_name
+    posture.scan_id = scan.id
+    posture.executed_at = scan.executed_at
+    posture.score = scan.score
+    posture.high_count = scan.high_count
+    posture.medium_count = scan.medium_count
+    posture.low_count = scan.low_count
+    posture.worst_categories_json = json.dumps(worst_categories(findings))
+    posture.updated_at = datetime.utcnow()
+    session.add(posture)
+
+
+def rebuild_missing_postures(session: Session) -> int:
+    """Backfill posture rows for credentials scanned before the table existed.
+
+    Also drops rows whose credential no longer exists, which scans finishing
+    after their credential's deletion could leave behind before execute_scan
+    re-checked the credential.
+    """
+    orphaned = session.execute(
+        delete(FleetPosture).where(FleetPosture.credential_id.not_in(select(Credential.id)))
+    ).rowcount
+    if orphaned:
+        session.commit()
+        logger.info("Removed fleet posture of %s deleted credentials", orphaned)
+
+    missing = session.exec(
+        select(Credential)
+        .join(ScanResult, ScanResult.credential_id == Credential.id)
+        .where(~Credential.id.in_(select(FleetPosture.credential_id)))
+        .distinct()
+    ).all()
+    for credential in missing:
+        scan = session.exec(
+            select(ScanResult)
+            .where(ScanResult.credential_id == credential.id)
+            .order_by(ScanResult.executed_at.desc())
+        ).first()
+        update_posture(session, credential, scan, load_findings(session, scan))
+    if missing:
+        session.commit()
+        logger.info("Rebuilt fleet posture for %s credentials", len(missing))
+    return len(missing)
+
+
+def fleet_summary(
+    session: Session,
+    sort_by: str = "score",
+    order: str = "asc",
+    account_id: Optional[str] = None,
+    min_score: Optional[int] = None,
+    max_score: Optional[int] = None,
+    has_high: Optional[bool] = None,
+    limit: int = 100,
+    offset: int = 0,
+) -> FleetSummary:
+    totals_row = session.exec(
+        select(
+            func.count(FleetPosture.credential_id),
+            func.avg(FleetPosture.score),
+            func.min(FleetPosture.score),
+            func.coalesce(func.sum(FleetPosture.high_count), 0),
+            func.coalesce(func.sum(FleetPosture.medium_count), 0),
+            func.coalesce(func.sum(FleetPosture.low_count), 0),
+        )
+    ).one()
+    totals = FleetTotals(
+        credentials=totals_row[0],
+        average_score=round(totals_row[1], 1) if totals_row[1] is not None else None,
+        min_score=totals_row[2],
+        high_count=totals_row[3],
+        medium_count=totals_row[4],
+        low_count=totals_row[5],
+    )
+
+    conditions = []
+    if account_id:
+        conditions.append(FleetPosture.account_id == account_id)
+    if min_score is not None:
+        conditions.append(FleetPosture.score >= min_score)
+    if max_score is not None:
+        conditions.append(FleetPosture.score <= max_score)
+    if has_high is True:
+        conditions.append(FleetPosture.high_count > 0)
+    elif has_high is False:
+        conditions.append(FleetPosture.high_count == 0)
+
+    matched = session.exec(
+        select(func.count(FleetPosture.credential_id)).where(*conditions)
+    ).one()
+
+    column = SORT_FIELDS[sort_by]
+    ordering = column.desc() if order == "desc" else column.asc()
+    rows = session.exec(
+        select(FleetPosture)
+        .where(*conditions)
+        .order_by(ordering, FleetPosture.credential_id)
+        .offset(offset)
+        .limit(limit)
+    ).all()
+
+    items = [
+        FleetPostureRead(
+            credential_id=row.credential_id,
+            credential_name=row.credential_name,
+            account_id=row.account_id,
+            role_name=row.role_name,
+            scan_id=row.scan_id,
+            executed_at=row.executed_at,
+            score=row.score,
+            high_count=row.high_count,
+            medium_count=row.medium_count,
+            low_count=row.low_count,
+            worst_categories=[CategoryImpact(**item) for item in json.loads(row.worst_categories_json)],
+        )
+        for row in rows
+    ]
+    return FleetSummary(totals=totals, matched=matched, items=items)
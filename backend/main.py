@@ -1,34 +1,47 @@
 import json
 import logging
 import os
-from pathlib import Path
-from typing import Dict, List, Optional
+import tempfile
+from datetime import datetime
+from typing import List, Optional
 
-from fastapi import Depends, FastAPI, HTTPException, status
+from fastapi import Depends, FastAPI, HTTPException, Query, Request, Response, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import FileResponse
 from pydantic import BaseModel, Field
 from sqlmodel import Session, select
+from starlette.background import BackgroundTask
 
-from db import get_session, init_db
+from db import get_session, init_db, session_scope
+from findings_store import load_findings
+from fleet import SORT_FIELDS, fleet_summary, rebuild_missing_postures
 from models import (
     Credential,
     CredentialCreate,
     CredentialRead,
+    FleetPosture,
+    FleetSummary,
     ScanResult,
     ScanResultDetail,
     ScanResultSummary,
+    ScanSchedule,
+    ScanScheduleCreate,
+    ScanScheduleRead,
 )
 from reports.pdf_generator import generate_pdf
-from services import (
-    cloudtrail_check,
-    ec2_check,
-    iam_check,
-    kms_check,
-    network_check,
-    rds_check,
-    s3_check,
+from result_cache import (
+    cache,
+    conditional_response,
+    forget_credential,
+    get_latest,
+    latest_version,
+    make_entry,
+    not_modified_response,
+    result_key,
 )
+from scheduler import SCHEDULER_ENABLED, compute_next_run, scheduler
+from services.scan_runner import CredentialDeletedError, ScanInProgressError, execute_scan
+from utils.cron import CronError, validate_cron
 
 logging.basicConfig(level=os.environ.get("LOG_LEVEL", "INFO"))
 logger = logging.getLogger(__name__)
@@ -51,12 +64,18 @@ class ScanRequest(BaseModel):
     )
 
 
-latest_results: Dict = {}
-
-
 @app.on_event("startup")
 def on_startup() -> None:
     init_db()
+    with session_scope() as session:
+        rebuild_missing_postures(session)
+    if SCHEDULER_ENABLED:
+        scheduler.start()
+
+
+@app.on_event("shutdown")
+def on_shutdown() -> None:
+    scheduler.stop()
 
 
 @app.post("/credentials", response_model=CredentialRead, status_code=status.HTTP_201_CREATED)
@@ -97,61 +116,204 @@ def delete_credential(credential_id: int, session: Session = Depends(get_session
     credential = session.get(Credential, credential_id)
     if not credential:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Credencial não encontrada.")
+    schedule = session.exec(
+        select(ScanSchedule).where(ScanSchedule.credential_id == credential_id)
+    ).first()
+    if schedule:
+        session.delete(schedule)
+    posture = session.get(FleetPosture, credential_id)
+    if posture:
+        session.delete(posture)
+    forget_credential(session, credential_id)
     session.delete(credential)
     session.commit()
 
 
-@app.get(
-    "/credentials/{credential_id}/history",
-    response_model=List[ScanResultSummary],
-)
-def get_history(credential_id: int, session: Session = Depends(get_session)) -> List[ScanResultSummary]:
+@app.put("/credentials/{credential_id}/schedule", response_model=ScanScheduleRead)
+def upsert_schedule(
+    credential_id: int, schedule_in: ScanScheduleCreate, session: Session = Depends(get_session)
+) -> ScanScheduleRead:
     credential = session.get(Credential, credential_id)
     if not credential:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Credencial não encontrada.")
 
-    results = session.exec(
-        select(ScanResult)
-        .where(ScanResult.credential_id == credential_id)
-        .order_by(ScanResult.executed_at.desc())
-    ).all()
+    try:
+        cron = validate_cron(schedule_in.cron)
+        next_run_at = compute_next_run(cron, datetime.utcnow(), schedule_in.jitter_seconds)
+    except CronError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail=f"Expressão cron inválida: {exc}"
+        )
+
+    schedule = session.exec(
+        select(ScanSchedule).where(ScanSchedule.credential_id == credential_id)
+    ).first()
+    if schedule is None:
+        schedule = ScanSchedule(credential_id=credential_id, **schedule_in.dict())
+    else:
+        schedule.jitter_seconds = schedule_in.jitter_seconds
+        schedule.enabled = schedule_in.enabled
+    schedule.cron = cron
+    schedule.next_run_at = next_run_at
+    session.add(schedule)
+    session.commit()
+    session.refresh(schedule)
+
+    return schedule
+
+
+@app.get("/credentials/{credential_id}/schedule", response_model=ScanScheduleRead)
+def get_schedule(credential_id: int, session: Session = Depends(get_session)) -> ScanScheduleRead:
+    schedule = session.exec(
+        select(ScanSchedule).where(ScanSchedule.credential_id == credential_id)
+    ).first()
+    if not schedule:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Agendamento não encontrado.")
+    return schedule
+
+
+@app.delete("/credentials/{credential_id}/schedule", status_code=status.HTTP_204_NO_CONTENT)
+def delete_schedule(credential_id: int, session: Session = Depends(get_session)) -> None:
+    schedule = session.exec(
+        select(ScanSchedule).where(ScanSchedule.credential_id == credential_id)
+    ).first()
+    if not schedule:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Agendamento não encontrado.")
+    session.delete(schedule)
+    session.commit()
+
 
-    return [
-        ScanResultSummary(
-            id=scan.id,
-            executed_at=scan.executed_at,
-            score=scan.score,
-            high_count=scan.high_count,
-            medium_count=scan.medium_count,
-            low_count=scan.low_count,
+@app.get(
+    "/credentials/{credential_id}/history",
+    response_model=List[ScanResultSummary],
+)
+def get_history(
+    credential_id: int, request: Request, session: Session = Depends(get_session)
+) -> Response:
+    # The history only changes when a new scan becomes the credential's latest result.
+    version, last_modified = latest_version(session, result_key(credential_id)) or (0, None)
+    etag = f'"history-{credential_id}-{version}"'
+    if last_modified is not None:
+        # The version alone identifies the body, so a matching client needs no history query.
+        not_modified = not_modified_response(request, etag, last_modified)
+        if not_modified is not None:
+            return not_modified
+
+    cache_key = ("history", credential_id, version)
+    entry = cache.get(cache_key)
+    if entry is None:
+        credential = session.get(Credential, credential_id)
+        if not credential:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Credencial não encontrada.")
+
+        results = session.exec(
+            select(ScanResult)
+            .where(ScanResult.credential_id == credential_id)
+            .order_by(ScanResult.executed_at.desc())
+        ).all()
+
+        summaries = [
+            {
+                "id": scan.id,
+                "executed_at": scan.executed_at,
+                "score": scan.score,
+                "high_count": scan.high_count,
+                "medium_count": scan.medium_count,
+                "low_count": scan.low_count,
+            }
+            for scan in results
+        ]
+        entry = make_entry(
+            summaries,
+            etag=etag,
+            last_modified=last_modified or credential.created_at,
         )
-        for scan in results
-    ]
+        # A versioned history never changes; without a latest result it may appear at any time.
+        cache.set(cache_key, entry, ttl=None if last_modified else cache.ttl)
+
+    return conditional_response(request, entry)
 
 
 @app.get("/history/{scan_id}", response_model=ScanResultDetail)
-def get_scan_detail(scan_id: int, session: Session = Depends(get_session)) -> ScanResultDetail:
-    scan = session.get(ScanResult, scan_id)
-    if not scan:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Histórico não encontrado.")
-
-    findings = json.loads(scan.findings_json or "[]")
-
-    return ScanResultDetail(
-        id=scan.id,
-        executed_at=scan.executed_at,
-        score=scan.score,
-        high_count=scan.high_count,
-        medium_count=scan.medium_count,
-        low_count=scan.low_count,
-        findings=findings,
+def get_scan_detail(scan_id: int, request: Request, session: Session = Depends(get_session)) -> Response:
+    cache_key = ("scan", scan_id)
+    entry = cache.get(cache_key)
+    if entry is None:
+        scan = session.get(ScanResult, scan_id)
+        if not scan:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Histórico não encontrado.")
+
+        detail = {
+            "id": scan.id,
+            "executed_at": scan.executed_at,
+            "score": scan.score,
+            "high_count": scan.high_count,
+            "medium_count": scan.medium_count,
+            "low_count": scan.low_count,
+            "findings": load_findings(session, scan),
+        }
+        entry = make_entry(detail, etag=f'"scan-{scan_id}"', last_modified=scan.executed_at)
+        # Stored scans never change, so the entry only leaves the cache by size eviction.
+        cache.set(cache_key, entry, ttl=None)
+
+    return conditional_response(request, entry)
+
+
+@app.get("/results/latest")
+def get_latest_result(
+    request: Request,
+    credential_id: Optional[int] = None,
+    account_id: Optional[str] = None,
+    role_name: Optional[str] = None,
+    session: Session = Depends(get_session),
+) -> Response:
+    if credential_id is None and not (account_id and role_name):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Informe credential_id ou account_id e role_name.",
+        )
+
+    entry = get_latest(session, result_key(credential_id, account_id, role_name))
+    if entry is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Nenhum scan executado ainda.")
+    return conditional_response(request, entry)
+
+
+@app.get("/fleet/summary", response_model=FleetSummary)
+def get_fleet_summary(
+    sort_by: str = "score",
+    order: str = "asc",
+    account_id: Optional[str] = None,
+    min_score: Optional[int] = Query(default=None, ge=0, le=100),
+    max_score: Optional[int] = Query(default=None, ge=0, le=100),
+    has_high: Optional[bool] = None,
+    limit: int = Query(default=100, ge=1, le=1000),
+    offset: int = Query(default=0, ge=0),
+    session: Session = Depends(get_session),
+) -> FleetSummary:
+    if sort_by not in SORT_FIELDS or order not in ("asc", "desc"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Ordenação inválida. Use sort_by em {sorted(SORT_FIELDS)} e order asc ou desc.",
+        )
+
+    return fleet_summary(
+        session,
+        sort_by=sort_by,
+        order=order,
+        account_id=account_id,
+        min_score=min_score,
+        max_score=max_score,
+        has_high=has_high,
+        limit=limit,
+        offset=offset,
     )
 
 
 @app.post("/scan")
-def run_scan(request: ScanRequest, session: Session = Depends(get_session)) -> Dict:
-    global latest_results
-
+def run_scan(
+    request: ScanRequest, http_request: Request, session: Session = Depends(get_session)
+) -> Response:
     credential: Optional[Credential] = None
     account_id = request.account_id
     role_name = request.role_name
@@ -171,74 +333,53 @@ def run_scan(request: ScanRequest, session: Session = Depends(get_session)) -> D
             detail="Informe account_id e role_name ou uma credencial armazenada.",
         )
 
-    scanners = [
-        iam_check.check_iam,
-        s3_check.check_s3,
-        cloudtrail_check.check_trail,
-        network_check.check_sg,
-        kms_check.check_kms,
-        ec2_check.check_ec2,
-        rds_check.check_rds,
-    ]
-
-    findings: List[Dict] = []
-    for scanner in scanners:
-        try:
-            findings.extend(scanner(account_id, role_name))
-        except Exception as exc:  # pragma: no cover - safeguard against unexpected failures
-            logger.exception("Scanner %s failed: %s", scanner.__name__, exc)
-
-    score = 100
-    severity_impact = {"High": 30, "Medium": 10, "Low": 5}
-    severity_breakdown = {"High": 0, "Medium": 0, "Low": 0}
-
-    for finding in findings:
-        severity = finding.get("severity")
-        if severity in severity_impact:
-            score -= severity_impact[severity]
-            severity_breakdown[severity] += 1
-
-    score = max(0, min(100, score))
-
-    scan_record: Optional[ScanResult] = None
-    if credential:
-        scan_record = ScanResult(
-            credential_id=credential.id,
-            score=score,
-            high_count=severity_breakdown["High"],
-            medium_count=severity_breakdown["Medium"],
-            low_count=severity_breakdown["Low"],
-            findings_json=json.dumps(findings),
+    try:
+        entry = execute_scan(session, account_id, role_name, credential)
+    except ScanInProgressError:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Já existe um scan em andamento para esta credencial.",
+        )
+    except CredentialDeletedError:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Credencial removida durante o scan."
         )
-        session.add(scan_record)
-        session.commit()
-        session.refresh(scan_record)
-
-    latest_results = {
-        "findings": findings,
-        "score": score,
-        "severity_breakdown": severity_breakdown,
-        "account_id": account_id,
-        "role_name": role_name,
-        "credential_id": credential.id if credential else None,
-        "scan_id": scan_record.id if scan_record else None,
-    }
 
-    return latest_results
+    return conditional_response(http_request, entry)
 
 
 @app.get("/export")
-def export_report():
-    if not latest_results:
-        raise HTTPException(status_code=400, detail="Nenhum scan executado ainda.")
-
-    reports_dir = Path(__file__).resolve().parent / "reports"
-    pdf_path = reports_dir / "cloudsec_report.pdf"
+def export_report(
+    credential_id: Optional[int] = None,
+    account_id: Optional[str] = None,
+    role_name: Optional[str] = None,
+    scan_id: Optional[int] = None,
+    session: Session = Depends(get_session),
+):
+    if scan_id is not None:
+        scan = session.get(ScanResult, scan_id)
+        if not scan:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Histórico não encontrado.")
+        results = {"score": scan.score, "findings": load_findings(session, scan)}
+    elif credential_id is not None or (account_id and role_name):
+        latest = get_latest(session, result_key(credential_id, account_id, role_name))
+        if latest is None:
+            raise HTTPException(status_code=400, detail="Nenhum scan executado ainda.")
+        results = json.loads(latest.body)
+    else:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Informe credential_id, scan_id ou account_id e role_name.",
+        )
 
-    generate_pdf(latest_results, str(pdf_path))
+    # One file per request so concurrent exports never overwrite each other.
+    handle, pdf_path = tempfile.mkstemp(prefix="cloudsec_report_", suffix=".pdf")
+    os.close(handle)
+    generate_pdf(results, pdf_path)
 
     return FileResponse(
-        path=str(pdf_path),
+        path=pdf_path,
         filename="cloudsec_report.pdf",
         media_type="application/pdf",
+        background=BackgroundTask(os.remove, pdf_path),
     )
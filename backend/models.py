@@ -33,7 +33,8 @@ class ScanResultBase(SQLModel):
     high_count: int = 0
     medium_count: int = 0
     low_count: int = 0
-    findings_json: str
+    # Legacy inline findings; new scans reference a FindingManifest through ScanManifest.
+    findings_json: str = ""
 
 
 class ScanResult(ScanResultBase, table=True):
@@ -43,6 +44,25 @@ class ScanResult(ScanResultBase, table=True):
     credential: Optional[Credential] = Relationship(back_populates="scans")
 
 
+class FindingBlob(SQLModel, table=True):
+    # Canonical JSON stored as-is: single findings are too small to gain from compression.
+    id: Optional[int] = Field(default=None, primary_key=True)
+    digest: bytes = Field(unique=True)  # raw SHA-256 of the canonical JSON
+    data: bytes
+
+
+class FindingManifest(SQLModel, table=True):
+    # Keyed by the SHA-256 of the ordered finding digests; data is the zlib-compressed,
+    # delta-encoded list of FindingBlob ids, which stays tiny for a mostly unchanged scan.
+    digest: bytes = Field(primary_key=True)
+    data: bytes
+
+
+class ScanManifest(SQLModel, table=True):
+    scan_id: int = Field(foreign_key="scanresult.id", primary_key=True)
+    manifest_digest: bytes = Field(foreign_key="findingmanifest.digest")
+
+
 class ScanResultRead(ScanResultBase):
     id: int
     credential_id: Optional[int]
@@ -59,3 +79,107 @@ class ScanResultSummary(SQLModel):
 
 class ScanResultDetail(ScanResultSummary):
     findings: List[dict]
+
+
+class ScanScheduleBase(SQLModel):
+    cron: str = Field(description="Five-field cron expression evaluated in UTC")
+    jitter_seconds: int = Field(default=300, ge=0, le=6 * 3600)
+    enabled: bool = True
+
+
+class ScanSchedule(ScanScheduleBase, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    credential_id: int = Field(foreign_key="credential.id", unique=True, index=True)
+    next_run_at: Optional[datetime] = Field(default=None, index=True)
+    last_run_at: Optional[datetime] = None
+    running_since: Optional[datetime] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
+
+
+class ScanLease(SQLModel, table=True):
+    """Marks a credential as being scanned, by any worker, manual or scheduled.
+
+    Deliberately not a foreign key: a credential may be deleted while its scan runs.
+    """
+
+    credential_id: int = Field(primary_key=True)
+    token: str
+    acquired_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
+
+
+class ScanScheduleCreate(ScanScheduleBase):
+    pass
+
+
+class ScanScheduleRead(ScanScheduleBase):
+    id: int
+    credential_id: int
+    next_run_at: Optional[datetime]
+    last_run_at: Optional[datetime]
+    running_since: Optional[datetime]
+
+
+class FleetPosture(SQLModel, table=True):
+    """Latest scan summary per credential, maintained whenever a ScanResult is stored."""
+
+    credential_id: int = Field(foreign_key="credential.id", primary_key=True)
+    credential_name: str
+    account_id: str = Field(index=True)
+    role_name: str
+    scan_id: int = Field(foreign_key="scanresult.id")
+    executed_at: datetime = Field(index=True)
+    score: int = Field(index=True)
+    high_count: int = 0
+    medium_count: int = 0
+    low_count: int = 0
+    worst_categories_json: str = "[]"
+    updated_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
+
+
+class LatestResult(SQLModel, table=True):
+    """Serialized payload of the most recent scan per credential or ad-hoc account/role pair.
+
+    Shared by every worker; ``result_cache`` keeps a short-lived copy in memory.
+    """
+
+    result_key: str = Field(primary_key=True)
+    credential_id: Optional[int] = Field(default=None, foreign_key="credential.id", index=True)
+    scan_id: Optional[int] = None
+    etag: str
+    payload: bytes
+    updated_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
+
+
+class CategoryImpact(SQLModel):
+    category: str
+    impact: int
+    findings: int
+
+
+class FleetPostureRead(SQLModel):
+    credential_id: int
+    credential_name: str
+    account_id: str
+    role_name: str
+    scan_id: int
+    executed_at: datetime
+    score: int
+    high_count: int
+    medium_count: int
+    low_count: int
+    worst_categories: List[CategoryImpact]
+
+
+class FleetTotals(SQLModel):
+    credentials: int = 0
+    average_score: Optional[float] = None
+    min_score: Optional[int] = None
+    high_count: int = 0
+    medium_count: int = 0
+    low_count: int = 0
+
+
+class FleetSummary(SQLModel):
+    totals: FleetTotals
+    matched: int
+    items: List[FleetPostureRead]
@@ -0,0 +1,339 @@
+"""Latest scan result per credential and conditional (ETag) responses.
+
+The latest payload of every credential (or ad-hoc account/role pair) lives in
+the ``LatestResult`` table so all uvicorn workers agree on it. Each worker
+keeps a bounded, TTL-evicting copy of the serialized bodies in memory, so a
+dashboard poll answered with ``304 Not Modified`` costs neither a database read
+nor a JSON serialization. Other workers pick up a new scan within the TTL.
+"""
+
+import hashlib
+import os
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Dict, Optional, Tuple
+
+from fastapi import Request, Response, status
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlmodel import Session, select
+
+from findings_store import load_findings
+from models import Credential, LatestResult, ScanResult
+from utils.serialization import (
+    COMPRESS_MIN_BYTES,
+    dumps,
+    encode,
+    negotiate_encoding,
+    supported_encodings,
+)
+
+CACHE_TTL_SECONDS = float(os.getenv("RESULT_CACHE_TTL_SECONDS", "5"))
+CACHE_MAX_ENTRIES = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "1024"))
+# Scan details can reach megabytes each, so the entry count alone does not bound memory.
+CACHE_MAX_BYTES = int(os.getenv("RESULT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+_DEFAULT_TTL = object()
+
+
+class CachedBody:
+    """Serialized JSON body plus its validators and lazily built compressed variants."""
+
+    __slots__ = ("body", "etag", "last_modified", "scan_id", "_encoded")
+
+    def __init__(
+        self, body: bytes, etag: str, last_modified: datetime, scan_id: Optional[int] = None
+    ) -> None:
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+        self.scan_id = scan_id
+        self._encoded: Dict[str, bytes] = {}
+
+    @property
+    def size(self) -> int:
+        """Bytes held by the body and every compressed variant built so far."""
+        return len(self.body) + sum(len(data) for data in self._encoded.values())
+
+    def encoded(self, encoding: str) -> bytes:
+        # Compressing once per entry keeps repeated polls from paying for it again.
+        data = self._encoded.get(encoding)
+        if data is None:
+            data = self._encoded[encoding] = encode(self.body, encoding)
+        return data
+
+
+class TTLCache:
+    """Thread-safe LRU of ``CachedBody`` entries that also expire ``ttl`` seconds after insertion.
+
+    Least recently used entries are evicted once either ``max_entries`` or
+    ``max_bytes`` (measured with ``CachedBody.size``) is exceeded.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = CACHE_MAX_ENTRIES,
+        ttl: float = CACHE_TTL_SECONDS,
+        max_bytes: int = CACHE_MAX_BYTES,
+    ) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._data: "OrderedDict[Any, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Any) -> Optional[CachedBody]:
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at is not None and expires_at <= now:
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Any, value: CachedBody, ttl: Any = _DEFAULT_TTL) -> None:
+        """Store ``value``; ``ttl=None`` keeps it until evicted by size (immutable data)."""
+        ttl = self.ttl if ttl is _DEFAULT_TTL else ttl
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            self._data.pop(key, None)
+            if value.size > self.max_bytes:
+                # Caching it would evict everything else and still not fit.
+                return
+            self._data[key] = (expires_at, value)
+            # Compressed variants are added after insertion, so sizes are re-measured here.
+            total = sum(item.size for _, item in self._data.values())
+            while len(self._data) > self.max_entries or total > self.max_bytes:
+                _, (_, evicted) = self._data.popitem(last=False)
+                total -= evicted.size
+
+    def pop(self, key: Any) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+cache = TTLCache()
+
+
+def result_key(
+    credential_id: Optional[int] = None,
+    account_id: Optional[str] = None,
+    role_name: Optional[str] = None,
+) -> str:
+    if credential_id is not None:
+        return f"credential:{credential_id}"
+    return f"account:{account_id}:{role_name}"
+
+
+def _etag_for(body: bytes) -> str:
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def store_latest(session: Session, payload: Dict) -> CachedBody:
+    """Upsert the latest result row in the caller's transaction without committing.
+
+    The returned entry should be handed to ``remember`` once the transaction commits.
+    """
+    key = result_key(payload.get("credential_id"), payload.get("account_id"), payload.get("role_name"))
+    body = dumps(payload)
+    entry = CachedBody(
+        body=body,
+        etag=_etag_for(body),
+        last_modified=datetime.utcnow(),
+        scan_id=payload.get("scan_id"),
+    )
+
+    values = {
+        "credential_id": payload.get("credential_id"),
+        "scan_id": entry.scan_id,
+        "etag": entry.etag,
+        "payload": zlib.compress(body),
+        "updated_at": entry.last_modified,
+    }
+    dialect = session.get_bind().dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        # Ad-hoc scans take no lease, so two first scans of one account/role pair
+        # may both insert the row; the later one simply overwrites it.
+        statement = (sqlite if dialect == "sqlite" else postgresql).insert(LatestResult)
+        session.execute(
+            statement.values(result_key=key, **values).on_conflict_do_update(
+                index_elements=[LatestResult.result_key], set_=values
+            )
+        )
+        return entry
+
+    row = session.get(LatestResult, key)
+    if row is None:
+        row = LatestResult(result_key=key, etag=entry.etag, payload=b"")
+    for field, value in values.items():
+        setattr(row, field, value)
+    session.add(row)
+    return entry
+
+
+def remember(key: str, entry: CachedBody) -> None:
+    cache.set(("latest", key), entry)
+
+
+def forget_credential(session: Session, credential_id: int) -> None:
+    """Drop the credential's latest result in the caller's transaction and the local cache."""
+    key = result_key(credential_id)
+    row = session.get(LatestResult, key)
+    if row is not None:
+        session.delete(row)
+    cache.pop(("latest", key))
+
+
+def get_latest(session: Session, key: str) -> Optional[CachedBody]:
+    """Return the latest result for ``key``, touching the database only on a local cache miss."""
+    entry = cache.get(("latest", key))
+    if entry is not None:
+        return entry
+
+    row = session.get(LatestResult, key)
+    if row is not None:
+        entry = CachedBody(
+            body=zlib.decompress(row.payload),
+            etag=row.etag,
+            last_modified=row.updated_at,
+            scan_id=row.scan_id,
+        )
+    elif key.startswith("credential:"):
+        entry = _rebuild_credential_latest(session, int(key.split(":", 1)[1]))
+
+    if entry is not None:
+        remember(key, entry)
+    return entry
+
+
+def latest_version(session: Session, key: str) -> Optional[Tuple[Optional[int], datetime]]:
+    """Scan id and update time of the latest result for ``key``, without loading its payload."""
+    entry = cache.get(("latest", key))
+    if entry is not None:
+        return entry.scan_id, entry.last_modified
+    return session.exec(
+        select(LatestResult.scan_id, LatestResult.updated_at).where(LatestResult.result_key == key)
+    ).first()
+
+
+def make_entry(payload: Any, etag: str, last_modified: datetime) -> CachedBody:
+    return CachedBody(body=dumps(payload), etag=etag, last_modified=last_modified)
+
+
+def _rebuild_credential_latest(session: Session, credential_id: int) -> Optional[CachedBody]:
+    """Build the latest-result row for credentials last scanned before LatestResult existed."""
+    credential = session.get(Credential, credential_id)
+    if credential is None:
+        return None
+    scan = session.exec(
+        select(ScanResult)
+        .where(ScanResult.credential_id == credential_id)
+        .order_by(ScanResult.executed_at.desc())
+    ).first()
+    if scan is None:
+        return None
+
+    payload = {
+        "findings": load_findings(session, scan),
+        "score": scan.score,
+        "severity_breakdown": {
+            "High": scan.high_count,
+            "Medium": scan.medium_count,
+            "Low": scan.low_count,
+        },
+        "account_id": credential.account_id,
+        "role_name": credential.role_name,
+        "credential_id": credential.id,
+        "scan_id": scan.id,
+    }
+    entry = store_latest(session, payload)
+    session.commit()
+    return entry
+
+
+def _http_date(value: datetime) -> str:
+    return format_datetime(value.replace(tzinfo=timezone.utc, microsecond=0), usegmt=True)
+
+
+def _encoded_etag(etag: str, encoding: Optional[str]) -> str:
+    """Strong ETag of ``encoding``'s variant: each content coding is a different representation."""
+    return f'{etag[:-1]}-{encoding}"' if encoding else etag
+
+
+def _not_modified(request: Request, etag: str, last_modified: datetime) -> Optional[str]:
+    """Return the client's validator that matches ``etag`` (or any encoded variant), or None."""
+    if request.method not in ("GET", "HEAD"):
+        return None
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        variants = {_encoded_etag(etag, encoding) for encoding in (None, *supported_encodings())}
+        for tag in (candidate.strip() for candidate in if_none_match.split(",")):
+            if tag == "*":
+                return etag
+            opaque = tag[2:] if tag.startswith("W/") else tag
+            if opaque in variants:
+                return opaque
+        return None
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return None
+        if since.tzinfo is not None:
+            since = since.astimezone(timezone.utc).replace(tzinfo=None)
+        if last_modified.replace(microsecond=0) <= since:
+            return etag
+    return None
+
+
+def _validator_headers(etag: str, last_modified: datetime) -> Dict[str, str]:
+    return {
+        "ETag": etag,
+        "Last-Modified": _http_date(last_modified),
+        "Cache-Control": "no-cache",
+        "Vary": "Accept-Encoding",
+    }
+
+
+def not_modified_response(request: Request, etag: str, last_modified: datetime) -> Optional[Response]:
+    """Return a 304 when the client's validators match, so callers can skip building the body.
+
+    ``etag`` is the identity tag. The body's encoding is not known yet, so the
+    304 repeats the client's own tag, whichever encoded variant it holds.
+    """
+    matched = _not_modified(request, etag, last_modified)
+    if matched is None:
+        return None
+    return Response(
+        status_code=status.HTTP_304_NOT_MODIFIED, headers=_validator_headers(matched, last_modified)
+    )
+
+
+def conditional_response(request: Request, entry: CachedBody) -> Response:
+    """Answer with 304 when the client already has ``entry``, else with its (compressed) body."""
+    encoding = None
+    if len(entry.body) >= COMPRESS_MIN_BYTES:
+        encoding = negotiate_encoding(request.headers.get("accept-encoding"))
+
+    headers = _validator_headers(_encoded_etag(entry.etag, encoding), entry.last_modified)
+    if _not_modified(request, entry.etag, entry.last_modified) is not None:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    content = entry.body
+    if encoding:
+        content = entry.encoded(encoding)
+        headers["Content-Encoding"] = encoding
+    return Response(content=content, media_type="application/json", headers=headers)
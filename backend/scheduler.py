@@ -0,0 +1,248 @@
+import logging
+import os
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import delete, func, update
+from sqlmodel import select
+
+from db import session_scope
+from models import Credential, ScanLease, ScanSchedule
+from services.scan_runner import (
+    SCAN_LEASE_TIMEOUT_SECONDS,
+    CredentialDeletedError,
+    claim_credential,
+    execute_scan,
+    is_credential_running,
+    lease_stale_before,
+    live_lease,
+    release_credential,
+)
+from utils.cron import CronError, CronSchedule
+
+logger = logging.getLogger(__name__)
+
+SCHEDULER_ENABLED = os.getenv("SCHEDULER_ENABLED", "true").lower() in ("1", "true", "yes")
+POLL_INTERVAL_SECONDS = float(os.getenv("SCHEDULER_POLL_INTERVAL_SECONDS", "30"))
+MAX_CONCURRENT_SCANS = int(os.getenv("SCHEDULER_MAX_CONCURRENT_SCANS", "2"))
+# Runs missed for longer than this while the backend was down are dropped instead of
+# coalesced into a single catch-up run. Zero disables the limit.
+MISFIRE_GRACE_SECONDS = int(os.getenv("SCHEDULER_MISFIRE_GRACE_SECONDS", str(24 * 3600)))
+
+
+def compute_next_run(cron: str, after: datetime, jitter_seconds: int = 0) -> datetime:
+    """Return the next cron slot after ``after`` shifted by a random jitter."""
+    next_run = CronSchedule(cron).next_run(after)
+    if jitter_seconds > 0:
+        next_run += timedelta(seconds=random.uniform(0, jitter_seconds))
+    return next_run
+
+
+class ScanScheduler:
+    """Background thread that runs scans for credentials with an enabled ScanSchedule.
+
+    A slot is claimed with a conditional UPDATE that moves ``next_run_at`` past
+    it, so several uvicorn workers can run a scheduler against the same database
+    without starting the same scan twice. The credential's ScanLease is the only
+    record of a running scan: a slot is skipped while any worker, manual or
+    scheduled, holds it, and the concurrency cap counts the live leases of
+    every worker. ``ScanSchedule.running_since`` is only shown to clients.
+    """
+
+    def __init__(
+        self,
+        poll_interval: float = POLL_INTERVAL_SECONDS,
+        max_concurrent: int = MAX_CONCURRENT_SCANS,
+        misfire_grace: int = MISFIRE_GRACE_SECONDS,
+    ) -> None:
+        self.poll_interval = poll_interval
+        self.max_concurrent = max(1, max_concurrent)
+        self.misfire_grace = timedelta(seconds=misfire_grace) if misfire_grace else None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._active = 0
+        self._active_lock = threading.Lock()
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_concurrent, thread_name_prefix="cloudsec-scan"
+        )
+        self.catch_up()
+        self._thread = threading.Thread(target=self._loop, name="cloudsec-scheduler", daemon=True)
+        self._thread.start()
+        logger.info(
+            "Scan scheduler started (poll=%ss, max_concurrent=%s)",
+            self.poll_interval,
+            self.max_concurrent,
+        )
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=self.poll_interval)
+            self._thread = None
+        if self._executor:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.tick()
+            except Exception as exc:  # pragma: no cover - keep the scheduler alive
+                logger.exception("Scheduler tick failed: %s", exc)
+            self._stop.wait(self.poll_interval)
+
+    def catch_up(self, now: Optional[datetime] = None) -> None:
+        """Reschedule runs missed while the backend was down.
+
+        Every missed slot of a schedule collapses into a single run, spread over
+        the schedule's jitter window so a restart does not fire them all at once.
+        Runs missed for longer than the misfire grace period are dropped. Leases
+        left by scans that died with the backend are dropped once their holder
+        stops renewing them; until then the catch-up run waits for them instead
+        of being skipped as busy.
+        """
+        now = now or datetime.utcnow()
+        with session_scope() as session:
+            session.execute(delete(ScanLease).where(ScanLease.acquired_at < lease_stale_before(now)))
+            held = dict(session.exec(select(ScanLease.credential_id, ScanLease.acquired_at)).all())
+            # Scans that died with the backend still show as running.
+            session.execute(
+                update(ScanSchedule)
+                .where(
+                    ScanSchedule.running_since != None,  # noqa: E711
+                    ScanSchedule.credential_id.not_in(list(held)),
+                )
+                .values(running_since=None)
+            )
+
+            overdue = session.exec(
+                select(ScanSchedule).where(
+                    ScanSchedule.enabled == True,  # noqa: E712
+                    ScanSchedule.next_run_at < now,
+                )
+            ).all()
+            for schedule in overdue:
+                missed_for = now - schedule.next_run_at
+                if self.misfire_grace is not None and missed_for > self.misfire_grace:
+                    logger.info(
+                        "Dropping runs missed for %s on credential %s", missed_for, schedule.credential_id
+                    )
+                    schedule.next_run_at = self._next_run(schedule, now)
+                else:
+                    offset = random.uniform(0, schedule.jitter_seconds) if schedule.jitter_seconds else 0
+                    run_at = now + timedelta(seconds=offset)
+                    renewed_at = held.get(schedule.credential_id)
+                    if renewed_at is not None:
+                        run_at = max(run_at, renewed_at + timedelta(seconds=SCAN_LEASE_TIMEOUT_SECONDS))
+                    schedule.next_run_at = run_at
+                session.add(schedule)
+            session.commit()
+
+    def tick(self, now: Optional[datetime] = None) -> int:
+        """Start every due schedule that fits under the concurrency cap; returns how many started."""
+        now = now or datetime.utcnow()
+        started = 0
+
+        with session_scope() as session:
+            running = session.exec(select(func.count()).select_from(ScanLease).where(live_lease())).one()
+            with self._active_lock:
+                slots = self.max_concurrent - max(running, self._active)
+
+            # Plain rows rather than ORM objects: the commits below would expire
+            # objects and reload values another worker already changed.
+            due = session.exec(
+                select(
+                    ScanSchedule.id,
+                    ScanSchedule.credential_id,
+                    ScanSchedule.next_run_at,
+                    ScanSchedule.cron,
+                    ScanSchedule.jitter_seconds,
+                )
+                .where(ScanSchedule.enabled == True, ScanSchedule.next_run_at <= now)  # noqa: E712
+                .order_by(ScanSchedule.next_run_at)
+            ).all()
+
+            for schedule in due:
+                busy = is_credential_running(session, schedule.credential_id)
+                if not busy and slots <= 0:
+                    # Leave it due; it starts as soon as a slot frees up.
+                    continue
+
+                # Whoever moves next_run_at past this slot owns it, busy or not.
+                claimed = session.execute(
+                    update(ScanSchedule)
+                    .where(
+                        ScanSchedule.id == schedule.id,
+                        ScanSchedule.next_run_at == schedule.next_run_at,
+                        ScanSchedule.next_run_at <= now,
+                    )
+                    .values(next_run_at=self._next_run(schedule, now))
+                ).rowcount
+                session.commit()
+                if not claimed:
+                    continue
+
+                lease_token = None if busy else claim_credential(session, schedule.credential_id)
+                if lease_token is None:
+                    # The previous scan is still in progress: skip this slot entirely.
+                    logger.info(
+                        "Skipping scheduled scan for credential %s: previous scan still running",
+                        schedule.credential_id,
+                    )
+                    continue
+
+                session.execute(
+                    update(ScanSchedule).where(ScanSchedule.id == schedule.id).values(running_since=now)
+                )
+                session.commit()
+                slots -= 1
+                started += 1
+                with self._active_lock:
+                    self._active += 1
+                self._executor.submit(self._run, schedule.id, schedule.credential_id, lease_token, now)
+
+        return started
+
+    def _next_run(self, schedule: ScanSchedule, now: datetime) -> Optional[datetime]:
+        try:
+            return compute_next_run(schedule.cron, now, schedule.jitter_seconds)
+        except CronError as exc:
+            logger.warning("Disabling schedule %s: %s", schedule.id, exc)
+            return None
+
+    def _run(self, schedule_id: int, credential_id: int, lease_token: str, started_at: datetime) -> None:
+        try:
+            with session_scope() as session:
+                credential = session.get(Credential, credential_id)
+                if credential is None:
+                    logger.warning("Credential %s no longer exists; skipping scheduled scan", credential_id)
+                    release_credential(session, credential_id, lease_token)
+                    return
+                execute_scan(session, credential.account_id, credential.role_name, credential, lease_token)
+                logger.info("Scheduled scan finished for credential %s", credential_id)
+        except CredentialDeletedError:
+            logger.info("Credential %s was deleted during its scheduled scan", credential_id)
+        except Exception as exc:
+            logger.exception("Scheduled scan for credential %s failed: %s", credential_id, exc)
+        finally:
+            with session_scope() as session:
+                session.execute(
+                    update(ScanSchedule)
+                    .where(ScanSchedule.id == schedule_id)
+                    .values(running_since=None, last_run_at=started_at)
+                )
+                session.commit()
+            with self._active_lock:
+                self._active -= 1
+
+
+scheduler = ScanScheduler()
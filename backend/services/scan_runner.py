@@ -0,0 +1,228 @@
+import logging
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import delete, update
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, select
+
+from db import session_scope
+from findings_store import store_findings
+from fleet import update_posture
+from models import Credential, ScanLease, ScanResult
+from result_cache import CachedBody, remember, result_key, store_latest
+from services import (
+    cloudtrail_check,
+    ec2_check,
+    iam_check,
+    kms_check,
+    network_check,
+    rds_check,
+    s3_check,
+)
+from utils.scoring import calculate_score
+
+logger = logging.getLogger(__name__)
+
+SCANNERS = [
+    iam_check.check_iam,
+    s3_check.check_s3,
+    cloudtrail_check.check_trail,
+    network_check.check_sg,
+    kms_check.check_kms,
+    ec2_check.check_ec2,
+    rds_check.check_rds,
+]
+
+# Every process renews the leases it holds each SCAN_LEASE_HEARTBEAT_SECONDS, so a lease
+# not renewed within SCAN_LEASE_TIMEOUT_SECONDS belongs to a worker that died mid-scan.
+SCAN_LEASE_TIMEOUT_SECONDS = int(os.getenv("SCAN_LEASE_TIMEOUT_SECONDS", "120"))
+SCAN_LEASE_HEARTBEAT_SECONDS = float(
+    os.getenv("SCAN_LEASE_HEARTBEAT_SECONDS", str(SCAN_LEASE_TIMEOUT_SECONDS / 4))
+)
+
+_held_leases: Dict[int, str] = {}
+_held_lock = threading.Lock()
+_heartbeat: Optional[threading.Thread] = None
+
+
+class ScanInProgressError(RuntimeError):
+    """Raised when a scan for the same credential is already running in any worker."""
+
+
+class CredentialDeletedError(RuntimeError):
+    """Raised when the credential was deleted while its scan ran; nothing is stored."""
+
+
+def lease_stale_before(now: datetime) -> datetime:
+    """Leases last renewed before this instant are abandoned and may be taken over."""
+    return now - timedelta(seconds=SCAN_LEASE_TIMEOUT_SECONDS)
+
+
+def live_lease():
+    """Filter selecting the ScanLease rows whose holder is still renewing them."""
+    return ScanLease.acquired_at >= lease_stale_before(datetime.utcnow())
+
+
+def renew_held_leases() -> None:
+    """Push back the expiry of every lease this process holds."""
+    with _held_lock:
+        tokens = list(_held_leases.values())
+    if not tokens:
+        return
+    with session_scope() as session:
+        session.execute(
+            update(ScanLease).where(ScanLease.token.in_(tokens)).values(acquired_at=datetime.utcnow())
+        )
+        session.commit()
+
+
+def _heartbeat_loop() -> None:
+    while True:
+        time.sleep(SCAN_LEASE_HEARTBEAT_SECONDS)
+        try:
+            renew_held_leases()
+        except Exception as exc:  # pragma: no cover - keep renewing on transient errors
+            logger.exception("Renewing scan leases failed: %s", exc)
+
+
+def _hold(credential_id: int, token: str) -> None:
+    global _heartbeat
+    with _held_lock:
+        _held_leases[credential_id] = token
+        if _heartbeat is None:
+            _heartbeat = threading.Thread(
+                target=_heartbeat_loop, name="cloudsec-lease-heartbeat", daemon=True
+            )
+            _heartbeat.start()
+
+
+def claim_credential(session: Session, credential_id: int) -> Optional[str]:
+    """Take the credential's scan lease; returns its token, or None when another scan holds it.
+
+    The lease is committed right away on the caller's session, so every worker
+    sees it before the scan starts. Reusing the caller's connection instead of
+    opening another one keeps concurrent scans from exhausting the pool. The
+    lease is renewed in the background until ``release_credential``.
+    """
+    token = uuid.uuid4().hex
+    now = datetime.utcnow()
+    session.add(ScanLease(credential_id=credential_id, token=token, acquired_at=now))
+    try:
+        session.commit()
+    except IntegrityError:
+        session.rollback()
+        taken_over = session.execute(
+            update(ScanLease)
+            .where(
+                ScanLease.credential_id == credential_id,
+                ScanLease.acquired_at < lease_stale_before(now),
+            )
+            .values(token=token, acquired_at=now)
+        ).rowcount
+        session.commit()
+        if not taken_over:
+            return None
+
+    _hold(credential_id, token)
+    return token
+
+
+def release_credential(session: Session, credential_id: int, token: str) -> None:
+    """Drop the lease taken with ``token``, discarding whatever the caller left uncommitted."""
+    with _held_lock:
+        if _held_leases.get(credential_id) == token:
+            del _held_leases[credential_id]
+    session.rollback()
+    session.execute(
+        delete(ScanLease).where(ScanLease.credential_id == credential_id, ScanLease.token == token)
+    )
+    session.commit()
+
+
+def is_credential_running(session: Session, credential_id: int) -> bool:
+    lease = session.exec(
+        select(ScanLease.credential_id).where(ScanLease.credential_id == credential_id, live_lease())
+    ).first()
+    return lease is not None
+
+
+def collect_findings(account_id: str, role_name: str) -> List[Dict]:
+    findings: List[Dict] = []
+    for scanner in SCANNERS:
+        try:
+            findings.extend(scanner(account_id, role_name))
+        except Exception as exc:  # pragma: no cover - safeguard against unexpected failures
+            logger.exception("Scanner %s failed: %s", scanner.__name__, exc)
+    return findings
+
+
+def execute_scan(
+    session: Session,
+    account_id: str,
+    role_name: str,
+    credential: Optional[Credential] = None,
+    lease_token: Optional[str] = None,
+) -> CachedBody:
+    """Run every scanner, persist the result for stored credentials and return its serialized entry.
+
+    Callers should respond with this entry rather than look the latest result
+    up again, which may already belong to a concurrent scan of the same target.
+    ``lease_token`` is a lease the caller already claimed for ``credential``;
+    it is released either way when the scan ends.
+    """
+    credential_id = credential.id if credential else None
+    if credential_id is not None and lease_token is None:
+        lease_token = claim_credential(session, credential_id)
+        if lease_token is None:
+            raise ScanInProgressError(f"Scan already running for credential {credential_id}")
+
+    try:
+        findings = collect_findings(account_id, role_name)
+        summary = calculate_score(findings)
+        score = summary["score"]
+        severity_breakdown = summary["severity_breakdown"]
+
+        scan_record: Optional[ScanResult] = None
+        if credential:
+            # Deleting a credential does not wait for its scan. The row lock keeps it
+            # until this transaction commits, so no posture or latest result outlives it.
+            exists = session.exec(
+                select(Credential.id).where(Credential.id == credential_id).with_for_update()
+            ).first()
+            if exists is None:
+                raise CredentialDeletedError(f"Credential {credential_id} was deleted during its scan")
+            scan_record = ScanResult(
+                credential_id=credential.id,
+                score=score,
+                high_count=severity_breakdown["High"],
+                medium_count=severity_breakdown["Medium"],
+                low_count=severity_breakdown["Low"],
+            )
+            session.add(scan_record)
+            session.flush()
+            store_findings(session, scan_record.id, findings)
+            update_posture(session, credential, scan_record, findings)
+
+        payload = {
+            "findings": findings,
+            "score": score,
+            "severity_breakdown": severity_breakdown,
+            "account_id": account_id,
+            "role_name": role_name,
+            "credential_id": credential.id if credential else None,
+            "scan_id": scan_record.id if scan_record else None,
+        }
+        latest = store_latest(session, payload)
+        # The scan row, findings, posture and latest result land in one transaction.
+        session.commit()
+        remember(result_key(credential.id if credential else None, account_id, role_name), latest)
+    finally:
+        if lease_token is not None:
+            release_credential(session, credential_id, lease_token)
+
+    return latest
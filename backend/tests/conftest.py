@@ -0,0 +1,58 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+# The backend modules import each other as top-level modules (``from utils.cron import ...``).
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+# Never point the suite at a real database: tables are dropped between tests.
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/test.db"
+os.environ["SCHEDULER_ENABLED"] = "false"
+
+
+@pytest.fixture
+def engine():
+    from sqlmodel import SQLModel
+
+    import db
+    from result_cache import cache
+
+    SQLModel.metadata.drop_all(db.engine)
+    SQLModel.metadata.create_all(db.engine)
+    cache.clear()
+    yield db.engine
+    cache.clear()
+
+
+@pytest.fixture
+def session(engine):
+    from db import session_scope
+
+    with session_scope() as session:
+        yield session
+
+
+@pytest.fixture
+def findings(monkeypatch):
+    """Findings every stubbed scanner run returns; tests may mutate the list."""
+    from services import scan_runner
+
+    current = [
+        {"category": "S3", "description": "Bucket public", "severity": "High"},
+        {"category": "IAM", "description": "Root access key", "severity": "Low"},
+    ]
+    monkeypatch.setattr(scan_runner, "SCANNERS", [lambda account_id, role_name: list(current)])
+    return current
+
+
+@pytest.fixture
+def client(engine, findings):
+    from fastapi.testclient import TestClient
+
+    import main
+
+    with TestClient(main.app) as client:
+        yield client
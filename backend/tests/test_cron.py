@@ -0,0 +1,66 @@
+from datetime import datetime
+
+import pytest
+
+from utils.cron import CronError, CronSchedule, validate_cron
+
+# Monday, 19 October 2026
+MONDAY = datetime(2026, 10, 19, 12, 34, 56)
+
+
+def test_ranges_and_lists():
+    schedule = CronSchedule("0 9-17 * * 1-5")
+    assert schedule.hours == set(range(9, 18))
+    assert schedule.weekdays == {1, 2, 3, 4, 5}
+    assert CronSchedule("15,45 * * * *").next_run(MONDAY) == datetime(2026, 10, 19, 12, 45)
+
+
+def test_steps():
+    assert CronSchedule("*/20 * * * *").minutes == {0, 20, 40}
+    assert CronSchedule("5/30 * * * *").minutes == {5, 35}
+    assert CronSchedule("10-50/20 * * * *").minutes == {10, 30, 50}
+    assert CronSchedule("*/15 * * * *").next_run(MONDAY) == datetime(2026, 10, 19, 12, 45)
+
+
+def test_next_run_is_strictly_after():
+    exact = datetime(2026, 10, 19, 12, 45)
+    assert CronSchedule("*/15 * * * *").next_run(exact) == datetime(2026, 10, 19, 13, 0)
+
+
+def test_day_of_month_and_weekday_are_ored_when_both_restricted():
+    # The 25th or any Wednesday: Wednesday 21 October comes first.
+    assert CronSchedule("0 0 25 * 3").next_run(MONDAY) == datetime(2026, 10, 21)
+    # Only one restricted: it must match on its own.
+    assert CronSchedule("0 0 25 * *").next_run(MONDAY) == datetime(2026, 10, 25)
+    assert CronSchedule("0 0 * * 3").next_run(MONDAY) == datetime(2026, 10, 21)
+
+
+def test_sunday_as_seven():
+    assert CronSchedule("0 0 * * 7").weekdays == {0}
+    assert CronSchedule("30 2 * * 7").next_run(MONDAY) == datetime(2026, 10, 25, 2, 30)
+
+
+def test_macros_and_month_rollover():
+    assert CronSchedule("@daily").next_run(MONDAY) == datetime(2026, 10, 20)
+    assert CronSchedule("0 0 1 1 *").next_run(MONDAY) == datetime(2027, 1, 1)
+    assert CronSchedule("0 0 29 2 *").next_run(MONDAY) == datetime(2028, 2, 29)
+
+
+def test_never_matching_expression():
+    with pytest.raises(CronError):
+        CronSchedule("0 0 30 2 *").next_run(MONDAY)
+
+
+@pytest.mark.parametrize(
+    "expression",
+    ["", "* * * *", "60 * * * *", "* 24 * * *", "* * 0 * *", "* * * 13 *", "*/0 * * * *", "5-1 * * * *", "a * * * *"],
+)
+def test_invalid_expressions(expression):
+    with pytest.raises(CronError):
+        CronSchedule(expression)
+
+
+def test_validate_cron_normalizes_whitespace():
+    assert validate_cron("  0   3 * *  1-5 ") == "0 3 * * 1-5"
+    with pytest.raises(CronError):
+        validate_cron("0 3 * *")
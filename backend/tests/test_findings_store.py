@@ -0,0 +1,105 @@
+import json
+
+from sqlalchemy import func
+from sqlmodel import select
+
+from findings_store import compact_findings, load_findings, store_findings
+from models import Credential, FindingBlob, FindingManifest, ScanManifest, ScanResult
+
+S3 = {"category": "S3", "description": "Bucket public", "severity": "High"}
+IAM = {"category": "IAM", "description": "Root access key", "severity": "Low"}
+KMS = {"severity": "Medium", "description": "Key rotation off", "category": "KMS"}
+
+
+def count(session, model):
+    return session.exec(select(func.count()).select_from(model)).one()
+
+
+def new_scan(session, findings_json=""):
+    credential = session.exec(select(Credential)).first()
+    if credential is None:
+        credential = Credential(name="prod", account_id="123456789012", role_name="Audit")
+        session.add(credential)
+        session.commit()
+    scan = ScanResult(credential_id=credential.id, score=50, findings_json=findings_json)
+    session.add(scan)
+    session.flush()
+    return scan
+
+
+def stored(session, findings):
+    scan = new_scan(session)
+    store_findings(session, scan.id, findings)
+    session.commit()
+    return scan
+
+
+def test_round_trip_keeps_order_and_duplicates(session):
+    findings = [IAM, S3, IAM, KMS, S3]
+    scan = stored(session, findings)
+
+    assert load_findings(session, scan) == findings
+    assert count(session, FindingBlob) == 3
+
+
+def test_empty_scan(session):
+    scan = stored(session, [])
+
+    assert load_findings(session, scan) == []
+    assert count(session, FindingBlob) == 0
+    assert count(session, ScanManifest) == 1
+
+
+def test_scan_without_manifest_has_no_findings(session):
+    scan = new_scan(session)
+    session.commit()
+
+    assert load_findings(session, scan) == []
+
+
+def test_identical_scans_share_one_manifest(session):
+    first = stored(session, [S3, IAM])
+    second = stored(session, [S3, IAM])
+    # Key order does not matter: findings are stored in canonical form.
+    third = stored(session, [dict(reversed(list(S3.items()))), IAM])
+
+    assert count(session, FindingManifest) == 1
+    assert count(session, FindingBlob) == 2
+    assert len({session.get(ScanManifest, scan.id).manifest_digest for scan in (first, second, third)}) == 1
+    assert load_findings(session, third) == [S3, IAM]
+
+
+def test_changed_scan_adds_only_new_findings(session):
+    stored(session, [S3, IAM])
+    changed = stored(session, [S3, KMS])
+
+    assert count(session, FindingManifest) == 2
+    assert count(session, FindingBlob) == 3
+    assert load_findings(session, changed) == [S3, KMS]
+
+
+def test_legacy_inline_rows_stay_readable(session):
+    scan = new_scan(session, findings_json=json.dumps([KMS, S3]))
+    session.commit()
+
+    assert load_findings(session, scan) == [KMS, S3]
+
+
+def test_compact_findings_migrates_across_batches(session):
+    legacy = [
+        new_scan(session, findings_json=json.dumps(findings))
+        for findings in ([S3, IAM], [S3, IAM], [KMS], [], [IAM, IAM, S3])
+    ]
+    session.commit()
+    expected = {scan.id: json.loads(scan.findings_json) for scan in legacy}
+
+    assert compact_findings(session, batch_size=2) == 5
+    assert compact_findings(session, batch_size=2) == 0
+
+    session.expire_all()
+    for scan in session.exec(select(ScanResult)).all():
+        assert scan.findings_json == ""
+        assert load_findings(session, scan) == expected[scan.id]
+    assert count(session, ScanManifest) == 5
+    assert count(session, FindingManifest) == 4
+    assert count(session, FindingBlob) == 3
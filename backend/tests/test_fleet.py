@@ -0,0 +1,58 @@
+from sqlmodel import select
+
+import main
+from db import session_scope
+from fleet import rebuild_missing_postures
+from models import FleetPosture, LatestResult, ScanResult
+from services import scan_runner
+
+
+def create_credential(client, name):
+    response = client.post(
+        "/credentials", json={"name": name, "account_id": "123456789012", "role_name": "Audit"}
+    )
+    return response.json()["id"]
+
+
+def test_credential_deleted_during_its_scan_leaves_no_posture(client, session, findings, monkeypatch):
+    kept = create_credential(client, "kept")
+    deleted = create_credential(client, "deleted")
+    assert client.post("/scan", json={"credential_id": kept}).status_code == 200
+
+    def deleting_scanner(account_id, role_name):
+        with session_scope() as other:
+            main.delete_credential(deleted, other)
+        return list(findings)
+
+    monkeypatch.setattr(scan_runner, "SCANNERS", [deleting_scanner])
+    assert client.post("/scan", json={"credential_id": deleted}).status_code == 404
+
+    summary = client.get("/fleet/summary").json()
+    assert summary["totals"]["credentials"] == 1
+    assert [item["credential_id"] for item in summary["items"]] == [kept]
+    assert session.get(LatestResult, f"credential:{deleted}") is None
+    assert session.exec(select(ScanResult).where(ScanResult.credential_id == deleted)).all() == []
+
+
+def test_rebuild_drops_posture_of_deleted_credentials(client, session):
+    kept = create_credential(client, "kept")
+    assert client.post("/scan", json={"credential_id": kept}).status_code == 200
+    # Left behind by an older build; SQLite does not enforce the foreign key.
+    scan = session.exec(select(ScanResult)).one()
+    session.add(
+        FleetPosture(
+            credential_id=999,
+            credential_name="ghost",
+            account_id="0",
+            role_name="r",
+            scan_id=scan.id,
+            executed_at=scan.executed_at,
+            score=0,
+        )
+    )
+    session.commit()
+
+    rebuild_missing_postures(session)
+
+    assert [row.credential_id for row in session.exec(select(FleetPosture)).all()] == [kept]
+    assert client.get("/fleet/summary").json()["totals"]["credentials"] == 1
@@ -0,0 +1,184 @@
+import threading
+from datetime import datetime, timedelta
+
+from result_cache import CachedBody, TTLCache, _http_date
+
+
+def create_credential(client, name="prod"):
+    response = client.post(
+        "/credentials", json={"name": name, "account_id": "123456789012", "role_name": "Audit"}
+    )
+    assert response.status_code == 201
+    return response.json()["id"]
+
+
+def scan(client, **body):
+    response = client.post("/scan", json=body)
+    assert response.status_code == 200
+    return response
+
+
+def assert_revalidates(client, url, **params):
+    first = client.get(url, params=params)
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+
+    for tag in (etag, f"W/{etag}", f'"other", {etag}'):
+        response = client.get(url, params=params, headers={"If-None-Match": tag})
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["etag"] == etag
+
+    assert client.get(url, params=params, headers={"If-None-Match": '"other"'}).status_code == 200
+    return first
+
+
+def test_scan_detail_revalidates(client):
+    credential_id = create_credential(client)
+    scan_id = scan(client, credential_id=credential_id).json()["scan_id"]
+
+    response = assert_revalidates(client, f"/history/{scan_id}")
+    assert response.headers["etag"] == f'"scan-{scan_id}"'
+    assert client.get("/history/999").status_code == 404
+
+
+def test_credential_history_etag_changes_with_a_new_scan(client):
+    credential_id = create_credential(client)
+    first_scan = scan(client, credential_id=credential_id).json()["scan_id"]
+    url = f"/credentials/{credential_id}/history"
+
+    before = assert_revalidates(client, url)
+    assert before.headers["etag"] == f'"history-{credential_id}-{first_scan}"'
+
+    second_scan = scan(client, credential_id=credential_id).json()["scan_id"]
+    after = client.get(url, headers={"If-None-Match": before.headers["etag"]})
+    assert after.status_code == 200
+    assert after.headers["etag"] == f'"history-{credential_id}-{second_scan}"'
+    assert [item["id"] for item in after.json()] == [second_scan, first_scan]
+
+
+def test_history_of_a_credential_never_scanned(client):
+    credential_id = create_credential(client)
+
+    response = assert_revalidates(client, f"/credentials/{credential_id}/history")
+    assert response.json() == []
+    assert client.get("/credentials/999/history").status_code == 404
+
+
+def test_latest_result_revalidates_by_etag_and_date(client):
+    credential_id = create_credential(client)
+    scanned = scan(client, credential_id=credential_id)
+
+    response = assert_revalidates(client, "/results/latest", credential_id=credential_id)
+    assert response.json() == scanned.json()
+    assert response.headers["etag"] == scanned.headers["etag"]
+
+    last_modified = response.headers["last-modified"]
+    params = {"credential_id": credential_id}
+    not_modified = client.get("/results/latest", params=params, headers={"If-Modified-Since": last_modified})
+    assert not_modified.status_code == 304
+    earlier = _http_date(datetime.utcnow() - timedelta(days=1))
+    modified = client.get("/results/latest", params=params, headers={"If-Modified-Since": earlier})
+    assert modified.status_code == 200
+
+
+def test_each_encoding_has_its_own_etag(client, findings):
+    findings.extend(
+        {"category": "S3", "description": f"Bucket {index} public", "severity": "High"}
+        for index in range(50)
+    )
+    credential_id = create_credential(client)
+    scan(client, credential_id=credential_id)
+    params = {"credential_id": credential_id}
+
+    identity = client.get("/results/latest", params=params, headers={"Accept-Encoding": "identity"})
+    gzipped = client.get("/results/latest", params=params, headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in identity.headers
+    assert gzipped.headers["content-encoding"] == "gzip"
+    assert gzipped.json() == identity.json()
+    assert gzipped.headers["etag"] == identity.headers["etag"][:-1] + '-gzip"'
+
+    # A client holding either variant is current, and learns the tag of what it would get now.
+    for held in (gzipped.headers["etag"], f"W/{gzipped.headers['etag']}"):
+        response = client.get(
+            "/results/latest",
+            params=params,
+            headers={"Accept-Encoding": "identity", "If-None-Match": held},
+        )
+        assert response.status_code == 304
+        assert response.headers["etag"] == identity.headers["etag"]
+    response = client.get(
+        "/results/latest",
+        params=params,
+        headers={"Accept-Encoding": "gzip", "If-None-Match": identity.headers["etag"]},
+    )
+    assert response.status_code == 304
+    assert response.headers["etag"] == gzipped.headers["etag"]
+
+
+def test_concurrent_first_scans_of_one_ad_hoc_target(client, monkeypatch):
+    from services import scan_runner
+
+    barrier = threading.Barrier(2)
+
+    def scanner(account_id, role_name):
+        barrier.wait(timeout=5)
+        return []
+
+    monkeypatch.setattr(scan_runner, "SCANNERS", [scanner])
+    statuses = []
+
+    def run():
+        response = client.post("/scan", json={"account_id": "210987654321", "role_name": "Audit"})
+        statuses.append(response.status_code)
+
+    threads = [threading.Thread(target=run) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert statuses == [200, 200]
+
+
+def entry(size):
+    return CachedBody(body=b"x" * size, etag='"e"', last_modified=datetime.utcnow())
+
+
+def test_cache_evicts_least_recently_used_by_bytes():
+    cache = TTLCache(max_entries=10, ttl=None, max_bytes=1000)
+    for key in range(3):
+        cache.set(key, entry(300))
+    assert cache.get(0) is not None  # 0 is now the most recently used
+
+    cache.set(3, entry(300))
+    assert cache.get(1) is None
+    assert all(cache.get(key) is not None for key in (0, 2, 3))
+
+
+def test_cache_counts_compressed_variants():
+    cache = TTLCache(max_entries=10, ttl=None, max_bytes=1000)
+    first = entry(400)
+    cache.set("first", first)
+    first._encoded["gzip"] = b"y" * 300
+    cache.set("second", entry(400))
+
+    assert cache.get("first") is None
+    assert cache.get("second") is not None
+
+
+def test_cache_skips_entries_larger_than_the_budget():
+    cache = TTLCache(max_entries=10, ttl=None, max_bytes=1000)
+    cache.set("small", entry(100))
+    cache.set("huge", entry(1001))
+
+    assert cache.get("huge") is None
+    assert cache.get("small") is not None
+
+
+def test_cache_expires_entries_with_a_ttl():
+    cache = TTLCache(max_entries=10, ttl=0)
+    cache.set("short", entry(10))
+    cache.set("immutable", entry(10), ttl=None)
+
+    assert cache.get("short") is None
+    assert cache.get("immutable") is not None
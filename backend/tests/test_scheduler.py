@@ -0,0 +1,142 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlmodel import select
+
+import scheduler as scheduler_module
+from models import Credential, ScanLease, ScanResult, ScanSchedule
+from scheduler import ScanScheduler
+from services.scan_runner import (
+    SCAN_LEASE_TIMEOUT_SECONDS,
+    claim_credential,
+    is_credential_running,
+    release_credential,
+    renew_held_leases,
+)
+
+NOW = datetime(2026, 10, 19, 12, 0, 30)
+
+
+class InlineExecutor:
+    def submit(self, fn, *args):
+        fn(*args)
+
+
+def make_scheduler(max_concurrent=5):
+    instance = ScanScheduler(max_concurrent=max_concurrent)
+    instance._executor = InlineExecutor()
+    return instance
+
+
+@pytest.fixture
+def due_credentials(session, findings):
+    ids = []
+    for index in range(2):
+        credential = Credential(name=f"c{index}", account_id=f"{index:012d}", role_name="Audit")
+        session.add(credential)
+        session.commit()
+        session.add(
+            ScanSchedule(
+                credential_id=credential.id,
+                cron="0 * * * *",
+                jitter_seconds=0,
+                next_run_at=NOW - timedelta(seconds=30),
+            )
+        )
+        session.commit()
+        ids.append(credential.id)
+    return ids
+
+
+def scan_counts(session):
+    session.expire_all()
+    return sorted(scan.credential_id for scan in session.exec(select(ScanResult)).all())
+
+
+def test_two_schedulers_run_each_slot_once(session, due_credentials, monkeypatch):
+    first, other = make_scheduler(), make_scheduler()
+    real_check = scheduler_module.is_credential_running
+    calls = []
+
+    def interleaved(session, credential_id):
+        # The other worker runs its whole tick after this one has listed the due slots.
+        if not calls:
+            calls.append(credential_id)
+            assert other.tick(NOW) == 2
+        return real_check(session, credential_id)
+
+    monkeypatch.setattr(scheduler_module, "is_credential_running", interleaved)
+    assert first.tick(NOW) == 0
+    assert scan_counts(session) == sorted(due_credentials)
+
+
+def test_slot_is_skipped_while_the_credential_is_leased(session, due_credentials):
+    session.add(ScanLease(credential_id=due_credentials[0], token="other", acquired_at=datetime.utcnow()))
+    session.commit()
+
+    assert make_scheduler().tick(NOW) == 1
+    assert scan_counts(session) == [due_credentials[1]]
+    schedule = session.exec(
+        select(ScanSchedule).where(ScanSchedule.credential_id == due_credentials[0])
+    ).one()
+    assert schedule.next_run_at == datetime(2026, 10, 19, 13, 0)
+
+
+def test_cap_counts_live_leases_of_every_worker(session, due_credentials):
+    outsider = Credential(name="manual", account_id="999999999999", role_name="Audit")
+    session.add(outsider)
+    session.commit()
+    session.add(ScanLease(credential_id=outsider.id, token="manual", acquired_at=datetime.utcnow()))
+    session.commit()
+
+    assert make_scheduler(max_concurrent=1).tick(NOW) == 0
+    # Still due: they start once the lease is released.
+    session.expire_all()
+    assert all(schedule.next_run_at < NOW for schedule in session.exec(select(ScanSchedule)).all())
+
+
+def test_catch_up_after_crash_takes_over_abandoned_lease(session, due_credentials):
+    # A scan died with the backend ten minutes ago, three hours after its slot.
+    now = datetime.utcnow()
+    for schedule in session.exec(select(ScanSchedule)).all():
+        schedule.next_run_at = now - timedelta(hours=3)
+        schedule.running_since = now - timedelta(minutes=10)
+        session.add(schedule)
+    session.add(
+        ScanLease(credential_id=due_credentials[0], token="dead", acquired_at=now - timedelta(minutes=10))
+    )
+    session.commit()
+
+    instance = make_scheduler()
+    instance.catch_up(now)
+    assert instance.tick(now) == 2
+    assert scan_counts(session) == sorted(due_credentials)
+    assert session.exec(select(ScanLease)).all() == []
+
+
+def test_catch_up_waits_for_a_lease_that_may_still_be_renewed(session, due_credentials):
+    now = datetime.utcnow()
+    renewed_at = now - timedelta(seconds=10)
+    session.add(ScanLease(credential_id=due_credentials[0], token="recent", acquired_at=renewed_at))
+    session.commit()
+
+    make_scheduler().catch_up(now)
+    session.expire_all()
+    schedule = session.exec(
+        select(ScanSchedule).where(ScanSchedule.credential_id == due_credentials[0])
+    ).one()
+    assert schedule.next_run_at == renewed_at + timedelta(seconds=SCAN_LEASE_TIMEOUT_SECONDS)
+
+
+def test_heartbeat_keeps_held_leases_alive(session, due_credentials):
+    token = claim_credential(session, due_credentials[0])
+    lease = session.get(ScanLease, due_credentials[0])
+    lease.acquired_at = datetime.utcnow() - timedelta(seconds=SCAN_LEASE_TIMEOUT_SECONDS + 1)
+    session.add(lease)
+    session.commit()
+    assert not is_credential_running(session, due_credentials[0])
+
+    renew_held_leases()
+    assert is_credential_running(session, due_credentials[0])
+    release_credential(session, due_credentials[0], token)
+    assert not is_credential_running(session, due_credentials[0])
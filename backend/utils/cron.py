@@ -0,0 +1,120 @@
+from datetime import datetime, timedelta
+from typing import List, Set, Tuple
+
+# (name, minimum, maximum) for each of the five standard cron fields
+_FIELDS: List[Tuple[str, int, int]] = [
+    ("minute", 0, 59),
+    ("hour", 0, 23),
+    ("day", 1, 31),
+    ("month", 1, 12),
+    ("weekday", 0, 7),
+]
+
+_MACROS = {
+    "@hourly": "0 * * * *",
+    "@daily": "0 0 * * *",
+    "@midnight": "0 0 * * *",
+    "@weekly": "0 0 * * 0",
+    "@monthly": "0 0 1 * *",
+}
+
+# Upper bound for the search in next_run; expressions such as "0 0 30 2 *" never match.
+_MAX_SEARCH = timedelta(days=366 * 5)
+
+
+class CronError(ValueError):
+    """Raised when a cron expression cannot be parsed."""
+
+
+def _parse_field(value: str, minimum: int, maximum: int) -> Set[int]:
+    values: Set[int] = set()
+    for part in value.split(","):
+        step = 1
+        if "/" in part:
+            part, raw_step = part.split("/", 1)
+            if not raw_step.isdigit() or int(raw_step) == 0:
+                raise CronError(f"Invalid step '{raw_step}'.")
+            step = int(raw_step)
+
+        if part == "*":
+            start, end = minimum, maximum
+        elif "-" in part:
+            raw_start, raw_end = part.split("-", 1)
+            if not raw_start.isdigit() or not raw_end.isdigit():
+                raise CronError(f"Invalid range '{part}'.")
+            start, end = int(raw_start), int(raw_end)
+        elif part.isdigit():
+            start = int(part)
+            end = maximum if step > 1 else start
+        else:
+            raise CronError(f"Invalid value '{part}'.")
+
+        if start < minimum or end > maximum or start > end:
+            raise CronError(f"Value '{part}' out of range {minimum}-{maximum}.")
+        values.update(range(start, end + 1, step))
+    return values
+
+
+class CronSchedule:
+    """Minimal five-field cron expression (minute hour day month weekday)."""
+
+    def __init__(self, expression: str) -> None:
+        self.expression = " ".join(expression.split())
+        normalized = _MACROS.get(self.expression.lower(), self.expression)
+        parts = normalized.split()
+        if len(parts) != len(_FIELDS):
+            raise CronError("Cron expressions must have exactly five fields.")
+
+        parsed = {}
+        for raw, (name, minimum, maximum) in zip(parts, _FIELDS):
+            parsed[name] = _parse_field(raw, minimum, maximum)
+
+        # Accept 7 as an alias for Sunday, as most cron implementations do.
+        if 7 in parsed["weekday"]:
+            parsed["weekday"] = (parsed["weekday"] - {7}) | {0}
+
+        self.minutes = parsed["minute"]
+        self.hours = parsed["hour"]
+        self.days = parsed["day"]
+        self.months = parsed["month"]
+        self.weekdays = parsed["weekday"]
+        self._day_restricted = parts[2] != "*"
+        self._weekday_restricted = parts[4] != "*"
+
+    def _day_matches(self, moment: datetime) -> bool:
+        # cron uses Sunday == 0 while Python uses Monday == 0
+        weekday = (moment.weekday() + 1) % 7
+        day_ok = moment.day in self.days
+        weekday_ok = weekday in self.weekdays
+        if self._day_restricted and self._weekday_restricted:
+            return day_ok or weekday_ok
+        return day_ok and weekday_ok
+
+    def next_run(self, after: datetime) -> datetime:
+        """Return the first matching minute strictly after ``after``."""
+        moment = after.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = after + _MAX_SEARCH
+
+        while moment <= limit:
+            if moment.month not in self.months:
+                year = moment.year + (moment.month == 12)
+                month = moment.month % 12 + 1
+                moment = moment.replace(year=year, month=month, day=1, hour=0, minute=0)
+                continue
+            if not self._day_matches(moment):
+                moment = moment.replace(hour=0, minute=0) + timedelta(days=1)
+                continue
+            if moment.hour not in self.hours:
+                moment = moment.replace(minute=0) + timedelta(hours=1)
+                continue
+            if moment.minute not in self.minutes:
+                moment += timedelta(minutes=1)
+                continue
+            return moment
+
+        raise CronError(f"Expression '{self.expression}' never matches.")
+
+
+def validate_cron(expression: str) -> str:
+    """Parse ``expression`` and return it with normalized whitespace, raising CronError when invalid."""
+    return CronSchedule(expression).expression
@@ -0,0 +1,36 @@
+from collections import defaultdict
+from typing import Dict, List
+
+SEVERITY_IMPACT = {"High": 30, "Medium": 10, "Low": 5}
+
+
+def calculate_score(findings: List[Dict]) -> Dict:
+    score = 100
+    severity_breakdown = {"High": 0, "Medium": 0, "Low": 0}
+
+    for finding in findings:
+        severity = finding.get("severity")
+        if severity in SEVERITY_IMPACT:
+            score -= SEVERITY_IMPACT[severity]
+            severity_breakdown[severity] += 1
+
+    return {"score": max(0, min(100, score)), "severity_breakdown": severity_breakdown}
+
+
+def worst_categories(findings: List[Dict], limit: int = 3) -> List[Dict]:
+    """Rank categories by the score they cost, using the same weights as the score itself."""
+    impact: Dict[str, int] = defaultdict(int)
+    counts: Dict[str, int] = defaultdict(int)
+    for finding in findings:
+        weight = SEVERITY_IMPACT.get(finding.get("severity"))
+        if weight is None:
+            continue
+        category = finding.get("category") or "-"
+        impact[category] += weight
+        counts[category] += 1
+
+    ranked = sorted(impact, key=lambda category: (-impact[category], category))
+    return [
+        {"category": category, "impact": impact[category], "findings": counts[category]}
+        for category in ranked[:limit]
+    ]
@@ -212,7 +212,11 @@ const Dashboard = () => {
     setError('')
     setInfo('')
     try {
+      const params = selectedCredential
+        ? { credential_id: selectedCredential.id }
+        : { account_id: accountId, role_name: roleName }
       const response = await axios.get(`${apiBaseUrl}/export`, {
+        params,
         responseType: 'blob'
       })
       const blob = new Blob([response.data], { type: 'application/pdf' })